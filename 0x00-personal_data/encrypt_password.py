@@ -1,13 +1,95 @@
 #!/usr/bin/env python3
 """Module for password encryption and validation."""
+import os
+import time
+from typing import Optional, Tuple
+
 import bcrypt
 
+MIN_ROUNDS = 4
+DEFAULT_ROUNDS = 12
+MAX_ROUNDS = 16
+
+
+def calibrate_rounds(target_ms: float = 250.0) -> int:
+    """Returns the highest bcrypt cost factor whose hash takes no more
+    than `target_ms` milliseconds on this host (at least MIN_ROUNDS)."""
+    rounds = MIN_ROUNDS
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    # Each extra round doubles the work
+    while rounds < MAX_ROUNDS and elapsed_ms * 2 <= target_ms:
+        rounds += 1
+        elapsed_ms *= 2
+    return rounds
+
+
+class HashingPolicy:
+    """bcrypt cost factor to use for new hashes.
+
+    The cost is calibrated on first use to take about
+    PASSWORD_HASH_TARGET_MS milliseconds (default 250) on this host,
+    but never below bcrypt's default of DEFAULT_ROUNDS, unless
+    PASSWORD_HASH_ROUNDS fixes it. bcrypt records the cost in each hash,
+    so old hashes keep verifying after a change; only weaker ones are
+    rehashed.
+    """
+
+    def __init__(self, rounds: Optional[int] = None,
+                 target_ms: Optional[float] = None):
+        self._rounds = rounds
+        self.target_ms = target_ms
+
+    @property
+    def rounds(self) -> int:
+        """Returns the cost factor, calibrating it if needed."""
+        if self._rounds is None:
+            rounds = os.getenv("PASSWORD_HASH_ROUNDS")
+            if rounds:
+                self._rounds = int(rounds)
+            else:
+                target_ms = self.target_ms
+                if target_ms is None:
+                    target_ms = float(
+                        os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+                self._rounds = max(calibrate_rounds(target_ms),
+                                   DEFAULT_ROUNDS)
+        return self._rounds
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        """Checks if a hash was made with a lower cost factor."""
+        return hash_rounds(hashed_password) < self.rounds
+
+
+POLICY = HashingPolicy()
+
+
+def hash_rounds(hashed_password: bytes) -> int:
+    """Returns the cost factor recorded in a bcrypt hash."""
+    return int(hashed_password.split(b"$")[2])
+
 
 def hash_password(password: str) -> bytes:
     """Returns a salted, hashed password."""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(POLICY.rounds))
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
     """Checks if the provided password matches the hashed password."""
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+def verify_and_maybe_rehash(
+    hashed_password: bytes, password: str
+) -> Tuple[bool, Optional[bytes]]:
+    """Checks a password and, when it matches a hash made with a lower
+    cost factor than the policy's, returns a new hash to store.
+
+    Returns (valid, new_hash), new_hash being None when nothing changes.
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if POLICY.needs_rehash(hashed_password):
+        return True, hash_password(password)
+    return True, None
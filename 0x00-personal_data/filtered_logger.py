@@ -1,18 +1,72 @@
 #!/usr/bin/env python3
 """Module for logging and database operations."""
+import atexit
+import collections
+import contextlib
+import copy
+import functools
 import logging
+import logging.handlers
+import multiprocessing
+import queue
 import re
+import sys
+import threading
+import time
 import mysql.connector
 import os
-from typing import List
+from typing import Callable, Iterator, List, Sequence, Tuple
+
+
+class Redactor:
+    """Obfuscates fields in `key=value<separator>` messages.
+
+    The regex is compiled once. With a one-character separator, messages
+    are redacted by a single split over the separator instead: a token
+    whose key ends with a field name gets its value replaced, and only a
+    token with another '=' in its value goes through the regex. Both
+    paths give the same result.
+    """
+
+    def __init__(self, fields: Sequence[str], redaction: str,
+                 separator: str):
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self.pattern = re.compile(
+            r'({})=[^{}]*'.format('|'.join(fields), separator))
+        self.replacement = r'\1={}'.format(redaction)
+        self.fast = (len(separator) == 1 and len(self.fields) > 0
+                     and '\\' not in redaction)
+
+    def redact(self, message: str) -> str:
+        """Returns the message with the values of the fields redacted."""
+        if not self.fast:
+            return self.pattern.sub(self.replacement, message)
+        tokens = message.split(self.separator)
+        for i, token in enumerate(tokens):
+            key, eq, value = token.partition('=')
+            if not eq:
+                continue
+            if key.endswith(self.fields):
+                tokens[i] = key + '=' + self.redaction
+            elif '=' in value:
+                tokens[i] = self.pattern.sub(self.replacement, token)
+        return self.separator.join(tokens)
+
+
+@functools.lru_cache(maxsize=128)
+def get_redactor(fields: Tuple[str, ...], redaction: str,
+                 separator: str) -> Redactor:
+    """Returns the cached Redactor of a field list."""
+    return Redactor(fields, redaction, separator)
 
 
 def filter_datum(
     fields: List[str], redaction: str, message: str, separator: str
 ) -> str:
     """Obfuscates specified fields in a log message."""
-    return re.sub(r'({})=[^{}]*'.format('|'.join(fields), separator),
-                  r'\1={}'.format(redaction), message)
+    return get_redactor(tuple(fields), redaction, separator).redact(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -25,27 +79,167 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super().__init__(self.FORMAT)
         self.fields = fields
+        self.redactor = get_redactor(tuple(fields), self.REDACTION,
+                                     self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
-        """Filters values in log records."""
-        return filter_datum(self.fields, self.REDACTION,
-                            super().format(record), self.SEPARATOR)
+        """Filters values in log records.
+
+        Records logged with `extra={"redacted": True}` were redacted
+        before formatting and are not filtered again.
+        """
+        if getattr(record, "redacted", False):
+            return super().format(record)
+        return self.redactor.redact(super().format(record))
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
-def get_logger() -> logging.Logger:
-    """Returns a logger with RedactingFormatter."""
+class BatchingStreamHandler(logging.StreamHandler):
+    """Stream handler writing records in batches.
+
+    Formatted records are buffered and written with a single write and
+    flush once `batch_size` are pending or `source` has run dry, and by
+    flush() and close().
+    """
+
+    def __init__(self, source: queue.Queue, batch_size: int = 100):
+        super().__init__()
+        self.source = source
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Buffers a record, writing the batch when it is due."""
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+            if len(self.buffer) >= self.batch_size or self.source.empty():
+                self.flush_batch()
+        except Exception:
+            self.handleError(record)
+
+    def flush_batch(self) -> None:
+        """Writes the buffered records."""
+        self.acquire()
+        try:
+            if self.buffer:
+                self.stream.write("".join(self.buffer))
+                self.buffer = []
+        finally:
+            self.release()
+        super().flush()
+
+    def flush(self) -> None:
+        """Writes the buffered records and flushes the stream."""
+        self.flush_batch()
+
+    def close(self) -> None:
+        """Writes the buffered records before closing."""
+        self.flush_batch()
+        super().close()
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop() waits for room in a full queue
+    instead of failing, so the records queued before it are written."""
+
+    def enqueue_sentinel(self) -> None:
+        """Queues the stop marker behind the pending records."""
+        self.queue.put(self._sentinel)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler over a bounded queue.
+
+    When the queue is full, records are dropped (and counted) or, with
+    `block`, the caller waits for room. Records are redacted and written
+    by a QueueListener thread, not by the caller.
+    """
+
+    def __init__(self, maxsize: int = 10000, block: bool = False):
+        super().__init__(queue.Queue(maxsize))
+        self.block = block
+        self.dropped = 0
+        self.listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merges the arguments into the message, leaving the formatting
+        (and so the redaction) to the listener thread."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queues a record according to the drop/block policy."""
+        try:
+            self.queue.put(record, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def metrics(self) -> dict:
+        """Returns the queue depth and the number of dropped records."""
+        return {"queue_depth": self.queue.qsize(), "dropped": self.dropped}
+
+    def close(self) -> None:
+        """Stops the listener, writing the records still queued."""
+        if self.listener is not None:
+            self.listener.stop()
+            for writer in self.listener.handlers:
+                writer.flush()
+            self.listener = None
+        super().close()
+
+
+def get_logger(asynchronous: bool = False, queue_size: int = 10000,
+               block: bool = False, batch_size: int = 100) -> logging.Logger:
+    """Returns a logger with RedactingFormatter.
+
+    With `asynchronous`, records go through a bounded queue to a
+    listener thread that redacts and writes them in batches (see
+    BoundedQueueHandler and BatchingStreamHandler). Calling it again
+    does not add handlers; it replaces the handler if the mode changes.
+    """
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
     logger.propagate = False
-    handler = logging.StreamHandler()
-    handler.setFormatter(RedactingFormatter(PII_FIELDS))
+    kind = BoundedQueueHandler if asynchronous else logging.StreamHandler
+    for handler in list(logger.handlers):
+        if handler.get_name() != "user_data":
+            continue
+        if type(handler) is kind:
+            return logger
+        logger.removeHandler(handler)
+        handler.close()
+
+    if asynchronous:
+        handler = BoundedQueueHandler(queue_size, block)
+        writer = BatchingStreamHandler(handler.queue, batch_size)
+        writer.setFormatter(RedactingFormatter(PII_FIELDS))
+        handler.listener = DrainingQueueListener(handler.queue, writer)
+        handler.listener.start()
+        atexit.register(handler.close)
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(RedactingFormatter(PII_FIELDS))
+    handler.set_name("user_data")
     logger.addHandler(handler)
     return logger
 
 
+def logger_metrics(logger: logging.Logger) -> dict:
+    """Returns the queue metrics of an asynchronous logger."""
+    for handler in logger.handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            return handler.metrics()
+    return {}
+
+
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """Returns a MySQL connection object."""
     return mysql.connector.connect(
@@ -56,20 +250,208 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     )
 
 
-def main():
-    """Retrieves and logs user data from the database."""
+class ConnectionPool:
+    """Pool of DB-API connections.
+
+    Keeps up to `size` idle connections, opens up to `max_overflow` more
+    under load (closed when given back to a full pool), and replaces a
+    connection older than `recycle` seconds (0: never) at checkout.
+    """
+
+    def __init__(self, connect: Callable, size: int = 5,
+                 max_overflow: int = 10, recycle: int = 3600):
+        self.connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.idle = []
+        self.opened = 0
+        self.created = {}
+        self.lock = threading.Lock()
+        # Notified whenever a connection is given back or a place freed
+        self.available = threading.Condition(self.lock)
+
+    def _open(self):
+        """Opens a new connection in a place already counted in
+        `opened`, remembering when."""
+        try:
+            db = self.connect()
+        except Exception:
+            with self.available:
+                self.opened -= 1
+                self.available.notify()
+            raise
+        self.created[id(db)] = time.monotonic()
+        return db
+
+    def _discard(self, db) -> None:
+        """Closes a connection and frees its place in the pool."""
+        with self.available:
+            self.opened -= 1
+            self.created.pop(id(db), None)
+            self.available.notify()
+        try:
+            db.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout: float = None):
+        """Checks a connection out, waiting at most `timeout` seconds when
+        `size + max_overflow` connections are already out."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        db = None
+        with self.available:
+            while True:
+                if self.idle:
+                    db = self.idle.pop()
+                    break
+                if self.opened < self.size + self.max_overflow:
+                    self.opened += 1
+                    break
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            "No connection available in the pool")
+                self.available.wait(remaining)
+        if db is None:
+            return self._open()
+        age = time.monotonic() - self.created.get(id(db), 0)
+        if self.recycle and age > self.recycle:
+            self._discard(db)
+            with self.available:
+                self.opened += 1
+            return self._open()
+        return db
+
+    def release(self, db) -> None:
+        """Gives a connection back, rolling back any open transaction."""
+        try:
+            db.rollback()
+        except Exception:
+            # Broken connection
+            self._discard(db)
+            return
+        with self.available:
+            if len(self.idle) < self.size:
+                self.idle.append(db)
+                self.available.notify()
+                return
+        # Full pool: overflow connection
+        self._discard(db)
+
+    @contextlib.contextmanager
+    def connection(self, timeout: float = None):
+        """Context manager checking a connection out of the pool."""
+        db = self.acquire(timeout)
+        try:
+            yield db
+        finally:
+            self.release(db)
+
+    def close(self) -> None:
+        """Closes the idle connections."""
+        with self.available:
+            idle, self.idle = self.idle, []
+        for db in idle:
+            self._discard(db)
+
+
+_db_pool = None
+
+
+def get_db_pool(size: int = 5, max_overflow: int = 10,
+                recycle: int = 3600) -> ConnectionPool:
+    """Returns the process-wide pool of get_db() connections, created
+    with the given settings on the first call."""
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = ConnectionPool(get_db, size, max_overflow, recycle)
+    return _db_pool
+
+
+def redact_row(columns: Sequence[str], row: Sequence,
+               fields: Sequence[str] = PII_FIELDS,
+               redaction: str = RedactingFormatter.REDACTION) -> str:
+    """Builds the log message of a row, redacted with the same rule as
+    RedactingFormatter (every key ending with a field name), so that it
+    can be logged with `extra={"redacted": True}`."""
+    message = "; ".join(
+        f"{column}={value}" for column, value in zip(columns, row))
+    return get_redactor(tuple(fields), redaction,
+                        RedactingFormatter.SEPARATOR).redact(message)
+
+
+def _redact_batch(args: Tuple[Sequence[str], List[Sequence]]) -> List[str]:
+    """Builds the log messages of a batch of rows, in a worker process."""
+    columns, rows = args
+    return [redact_row(columns, row) for row in rows]
+
+
+def _fetch_batches(cursor, batch_size: int) -> Iterator[List[Sequence]]:
+    """Yields the rows of an executed cursor, `batch_size` at a time."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _log_messages(logger: logging.Logger, messages: List[str]) -> int:
+    """Logs already redacted messages, returns how many."""
+    for log_message in messages:
+        logger.info(log_message, extra={"redacted": True})
+    return len(messages)
+
+
+def main(batch_size: int = 1000, processes: int = 0):
+    """Retrieves and logs user data from the database.
+
+    Rows are streamed from an unbuffered cursor `batch_size` at a time
+    and redacted before formatting; with `processes` > 0 the messages
+    are built by a pool of worker processes, with at most two batches
+    per process in flight. The throughput is reported on stderr at the
+    end.
+    """
     logger = get_logger()
     db = get_db()
-    cursor = db.cursor()
+    cursor = db.cursor(buffered=False)
     cursor.execute("SELECT * FROM users;")
-    for row in cursor:
-        log_message = "; ".join(
-            [f"{field}={value}" for field,
-                value in zip(cursor.column_names, row)]
-        )
-        logger.info(log_message)
-    cursor.close()
-    db.close()
+    columns = cursor.column_names
+    batches = ((columns, rows) for rows in _fetch_batches(cursor, batch_size))
+
+    pool = multiprocessing.Pool(processes) if processes > 0 else None
+    count = 0
+    start = time.perf_counter()
+    try:
+        if pool is None:
+            for args in batches:
+                count += _log_messages(logger, _redact_batch(args))
+        else:
+            # The cursor is read on this thread, and no faster than the
+            # messages are logged, so the table is never held in memory
+            pending = collections.deque()
+            for args in batches:
+                pending.append(pool.apply_async(_redact_batch, (args,)))
+                if len(pending) >= 2 * processes:
+                    count += _log_messages(logger, pending.popleft().get())
+            while pending:
+                count += _log_messages(logger, pending.popleft().get())
+            pool.close()
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+        cursor.close()
+        db.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count} rows in {elapsed:.2f}s "
+          f"({count / elapsed if elapsed else 0:.0f} rows/s)",
+          file=sys.stderr)
 
 
 if __name__ == "__main__":
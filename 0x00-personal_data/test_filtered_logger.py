@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""Tests for filtered_logger."""
+import unittest
+
+from filtered_logger import (PII_FIELDS, RedactingFormatter, filter_datum,
+                             redact_row)
+
+
+class TestRedactRow(unittest.TestCase):
+    """redact_row must redact exactly like filter_datum."""
+
+    def test_matches_filter_datum(self):
+        """Rows give the same message as the filter_datum path."""
+        columns = ("name", "first_name", "username", "user_email", "phone",
+                   "ssn", "password", "ip", "last_login", "user_agent")
+        row = ("Ann", "Ann", "ann1", "a@b.c", "555", "123-45-6789", "pw",
+               "10.0.0.1", "2019-11-14 06:16:24", "Mozilla x=name=y")
+        message = "; ".join(
+            f"{column}={value}" for column, value in zip(columns, row))
+        expected = filter_datum(list(PII_FIELDS),
+                                RedactingFormatter.REDACTION, message,
+                                RedactingFormatter.SEPARATOR)
+        self.assertEqual(redact_row(columns, row), expected)
+        self.assertNotIn("ann1", redact_row(columns, row))
+        self.assertNotIn("a@b.c", redact_row(columns, row))
+
+
+if __name__ == "__main__":
+    unittest.main()
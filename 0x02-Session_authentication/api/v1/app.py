@@ -4,6 +4,7 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
+from api.v1.auth.auth import PathMatcher
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
@@ -14,6 +15,11 @@ app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 auth = None
 
+# Paths excluded from authentication, compiled once
+EXCLUDED_PATHS = PathMatcher(['/api/v1/status/',
+                              '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/',
+                              '/api/v1/auth_session/login/'])
 
 # Initialize auth based on AUTH_TYPE environment variable
 auth_type = getenv('AUTH_TYPE')
@@ -37,24 +43,19 @@ def before_request():
     if auth is None:
         return
 
-    # List of excluded paths
-    excluded_paths = ['/api/v1/status/',
-                      '/api/v1/unauthorized/',
-                      '/api/v1/forbidden/',
-                      '/api/v1/auth_session/login/']
-
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
         return
 
-    if auth.authorization_header(request) is None and\
-            auth.session_cookie(request) is None:
+    result = auth.authenticate(request)
+    request.auth_result = result
+    request.current_user = result.user
+
+    if result.reason == 'missing_credentials':
         abort(401)
 
-    if auth.current_user(request) is None:
+    if result.reason is not None:
         abort(403)
 
-    request.current_user = auth.current_user(request)
-
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -3,38 +3,105 @@
 Authentication module for the API
 """
 from typing import List, TypeVar
-import os as getenv
+from os import getenv
+
+
+class AuthResult:
+    """Outcome of authenticating one request"""
+
+    def __init__(self, user=None, method: str = None, reason: str = None):
+        """
+        Args:
+            user: The authenticated User, or None
+            method (str): Name of the authentication mechanism used
+            reason (str): Why authentication failed, None on success
+        """
+        self.user = user
+        self.method = method
+        self.reason = reason
+
+    def __bool__(self) -> bool:
+        """True if a user has been authenticated"""
+        return self.user is not None
+
+
+class PathMatcher:
+    """Excluded paths compiled for constant-ish time lookups
+
+    An entry ending with '*' matches every path starting with what
+    precedes the '*', a path being compared with a single trailing slash
+    so that '/api/v1/*' matches '/api/v1' but not '/api/v1beta'. Any
+    other entry matches only that path, trailing slashes ignored.
+    """
+
+    def __init__(self, excluded_paths: List[str]):
+        """
+        Args:
+            excluded_paths (List[str]): Paths that don't need authentication
+        """
+        self.exact = set()
+        self.prefixes = {}
+        for excluded_path in excluded_paths:
+            if not excluded_path:
+                continue
+            if excluded_path[-1] == '*':
+                node = self.prefixes
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                node[None] = True
+            else:
+                self.exact.add(excluded_path.rstrip('/'))
+
+    def match(self, path: str) -> bool:
+        """
+        Returns True if path is excluded
+        """
+        path = path.rstrip('/')
+        if path in self.exact:
+            return True
+        node = self.prefixes
+        for char in path + '/':
+            if None in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return None in node
 
 
 class Auth:
     """Authentication class"""
 
+    method = 'auth'
+
+    def __init__(self):
+        """Initialize the counter of authentication passes"""
+        self.authentications = 0
+        self.path_matchers = {}
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Determines whether a given path requires authentication or not
         Args:
             path (str): Url path to be checked
             excluded_paths (List[str]): List of paths that don't need
-            authentication
+            authentication, or a PathMatcher compiled from it
         Return:
             - True if path is not in excluded_paths, else False
         """
         if path is None or excluded_paths is None or not excluded_paths:
             return True
 
-        if path[-1] != '/':
-            path += '/'
-
-        for excluded_path in excluded_paths:
-            if excluded_path[-1] == '*':
-                excluded_path = excluded_path[:-1]
-            if excluded_path[-1] != '/':
-                excluded_path += '/'
+        if isinstance(excluded_paths, PathMatcher):
+            return not excluded_paths.match(path)
 
-            if path.startswith(excluded_path):
-                return False
+        key = tuple(excluded_paths)
+        matcher = self.path_matchers.get(key)
+        if matcher is None:
+            matcher = PathMatcher(excluded_paths)
+            self.path_matchers[key] = matcher
 
-        return True
+        return not matcher.match(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -51,6 +118,26 @@ class Auth:
         """
         return None
 
+    def authenticate(self, request=None) -> AuthResult:
+        """
+        Runs a single authentication pass over a request object
+        Return:
+            - AuthResult with the user, or the failure reason
+              ('missing_credentials' or 'invalid_credentials')
+        """
+        self.authentications += 1
+        if self.authorization_header(request) is None and\
+                self.session_cookie(request) is None:
+            return AuthResult(method=self.method,
+                              reason='missing_credentials')
+
+        user = self.current_user(request)
+        if user is None:
+            return AuthResult(method=self.method,
+                              reason='invalid_credentials')
+
+        return AuthResult(user, self.method)
+
     def session_cookie(self, request=None):
         """
         Returns a cookie value from a request
@@ -3,7 +3,13 @@
 Basic Authentication module
 """
 from api.v1.auth.auth import Auth
+from collections import OrderedDict
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
 from models.user import User
 from typing import TypeVar, Tuple
 
@@ -13,8 +19,66 @@ class BasicAuth(Auth):
     Basic Authentication class
     """
 
+    method = 'basic_auth'
+
     def __init__(self):
         super().__init__()
+        # Verified credentials: keyed digest of the Authorization header
+        # -> (user id, password hash, expiry), in LRU order, shared by
+        # the request threads under credentials_lock
+        self.credentials_cache = OrderedDict()
+        self.credentials_lock = threading.Lock()
+        self.credentials_cache_size = int(
+            os.getenv('BASIC_AUTH_CACHE_SIZE', '10000'))
+        self.credentials_cache_ttl = int(
+            os.getenv('BASIC_AUTH_CACHE_TTL', '300'))
+        self._cache_key = os.urandom(32)
+
+    def _header_digest(self, authorization_header: str) -> bytes:
+        """
+        Returns a keyed digest of an Authorization header, so the cache
+        never holds the credentials themselves.
+        """
+        return hmac.new(self._cache_key, authorization_header.encode(),
+                        hashlib.sha256).digest()
+
+    def cached_user(self, authorization_header: str) -> TypeVar('User'):
+        """
+        Returns the User previously verified for an Authorization header.
+
+        The entry is dropped when it has expired, when the user has been
+        removed or when the user's password has changed since.
+        """
+        digest = self._header_digest(authorization_header)
+        with self.credentials_lock:
+            entry = self.credentials_cache.get(digest)
+        if entry is None:
+            return None
+        user_id, password, expires_at = entry
+        user = User.get(user_id)
+        with self.credentials_lock:
+            if expires_at < time.monotonic() or user is None or \
+                    user.password != password:
+                self.credentials_cache.pop(digest, None)
+                return None
+            if digest in self.credentials_cache:
+                self.credentials_cache.move_to_end(digest)
+        return user
+
+    def cache_user(self, authorization_header: str, user: TypeVar('User')):
+        """
+        Remembers the User verified for an Authorization header.
+        """
+        if self.credentials_cache_size <= 0:
+            return
+        digest = self._header_digest(authorization_header)
+        expires_at = time.monotonic() + self.credentials_cache_ttl
+        with self.credentials_lock:
+            self.credentials_cache[digest] = (user.id, user.password,
+                                              expires_at)
+            self.credentials_cache.move_to_end(digest)
+            while len(self.credentials_cache) > self.credentials_cache_size:
+                self.credentials_cache.popitem(last=False)
 
     def extract_base64_authorization_header(
             self, authorization_header: str) -> str:
@@ -99,6 +163,10 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
+        user = self.cached_user(auth_header)
+        if user is not None:
+            return user
+
         base64_header = self.extract_base64_authorization_header(auth_header)
         if base64_header is None:
             return None
@@ -111,4 +179,7 @@ class BasicAuth(Auth):
         if user_email is None or user_pwd is None:
             return None
 
-        return self.user_object_from_credentials(user_email, user_pwd)
+        user = self.user_object_from_credentials(user_email, user_pwd)
+        if user is not None:
+            self.cache_user(auth_header, user)
+        return user
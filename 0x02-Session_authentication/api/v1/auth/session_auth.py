@@ -4,6 +4,7 @@ Session Authentication Module
 """
 
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import session_store_from_env
 import uuid
 from models.user import User
 
@@ -12,7 +13,11 @@ class SessionAuth(Auth):
     """
     Session Authentication Class
     """
-    user_id_by_session_id = {}
+    method = 'session_auth'
+
+    def __init__(self):
+        super().__init__()
+        self.session_store = session_store_from_env()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -28,7 +33,7 @@ class SessionAuth(Auth):
             return None
 
         session_id = str(uuid.uuid4())
-        self.user_id_by_session_id[session_id] = user_id
+        self.session_store.set(session_id, user_id)
         return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -44,7 +49,7 @@ class SessionAuth(Auth):
         if session_id is None or not isinstance(session_id, str):
             return None
 
-        return self.user_id_by_session_id.get(session_id)
+        return self.session_store.get(session_id)
 
     def current_user(self, request=None):
         """
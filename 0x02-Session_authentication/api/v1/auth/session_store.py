@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Session stores for Session Authentication
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from os import getenv
+import fcntl
+import heapq
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+
+class SessionStore(ABC):
+    """
+    Maps Session IDs to User IDs, expiring them after `ttl` seconds
+    from creation and/or `idle_timeout` seconds without access
+    (0 disables either limit)
+    """
+
+    def __init__(self, ttl: int = 0, idle_timeout: int = 0):
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+
+    def deadline(self, created_at: float, now: float) -> float:
+        """
+        Returns the time at which a session accessed at `now` expires,
+        or None if it never does.
+        """
+        deadlines = []
+        if self.ttl > 0:
+            deadlines.append(created_at + self.ttl)
+        if self.idle_timeout > 0:
+            deadlines.append(now + self.idle_timeout)
+        return min(deadlines) if deadlines else None
+
+    @abstractmethod
+    def set(self, session_id: str, user_id: str) -> None:
+        """Stores a session"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> str:
+        """Returns the User ID of a live session, or None"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Removes a session, returns False if it didn't exist"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Per-process session store; expiry deadlines are kept in a heap and
+    popped as they pass, so no operation scans every session. A session
+    has one heap entry: an idle refresh only moves its deadline in
+    `sessions`, and the entry is pushed back when popped too early.
+    """
+
+    def __init__(self, ttl: int = 0, idle_timeout: int = 0):
+        super().__init__(ttl, idle_timeout)
+        # session_id -> (user_id, created_at, expires_at)
+        self.sessions = {}
+        # (expires_at, session_id), possibly earlier than the session's
+        # deadline after an idle refresh
+        self.deadlines = []
+        self.lock = threading.Lock()
+
+    def expire(self, now: float) -> None:
+        """Drops the sessions whose deadline has passed"""
+        while self.deadlines and self.deadlines[0][0] <= now:
+            expires_at, session_id = heapq.heappop(self.deadlines)
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                continue
+            if entry[2] <= now:
+                del self.sessions[session_id]
+            else:
+                heapq.heappush(self.deadlines, (entry[2], session_id))
+
+    def set(self, session_id: str, user_id: str) -> None:
+        """Stores a session"""
+        now = time.time()
+        expires_at = self.deadline(now, now)
+        with self.lock:
+            self.expire(now)
+            scheduled = session_id in self.sessions
+            self.sessions[session_id] = (user_id, now, expires_at)
+            if expires_at is not None and not scheduled:
+                heapq.heappush(self.deadlines, (expires_at, session_id))
+
+    def get(self, session_id: str) -> str:
+        """Returns the User ID of a live session, or None"""
+        now = time.time()
+        with self.lock:
+            self.expire(now)
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return None
+            user_id, created_at, expires_at = entry
+            if self.idle_timeout > 0:
+                expires_at = self.deadline(created_at, now)
+                self.sessions[session_id] = (user_id, created_at, expires_at)
+            return user_id
+
+    def delete(self, session_id: str) -> bool:
+        """Removes a session, returns False if it didn't exist"""
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a SQLite file, shared by every worker process of
+    the host. Expired rows are purged through an index on expires_at.
+    """
+
+    purge_every = 100
+
+    def __init__(self, db_path: str, ttl: int = 0, idle_timeout: int = 0):
+        super().__init__(ttl, idle_timeout)
+        self.db_path = db_path
+        self.local = threading.local()
+        self.writes = 0
+        db = self.connection()
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                       "session_id TEXT PRIMARY KEY, "
+                       "user_id TEXT NOT NULL, "
+                       "created_at REAL NOT NULL, "
+                       "expires_at REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at "
+                       "ON sessions (expires_at)")
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread"""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            self.local.db = db
+        return db
+
+    def set(self, session_id: str, user_id: str) -> None:
+        """Stores a session"""
+        now = time.time()
+        db = self.connection()
+        with db:
+            db.execute("INSERT OR REPLACE INTO sessions "
+                       "VALUES (?, ?, ?, ?)",
+                       (session_id, user_id, now, self.deadline(now, now)))
+            self.writes += 1
+            if self.writes % self.purge_every == 0:
+                db.execute("DELETE FROM sessions WHERE expires_at <= ?",
+                           (now,))
+
+    def get(self, session_id: str) -> str:
+        """Returns the User ID of a live session, or None"""
+        now = time.time()
+        db = self.connection()
+        row = db.execute("SELECT user_id, created_at FROM sessions "
+                         "WHERE session_id = ? AND "
+                         "(expires_at IS NULL OR expires_at > ?)",
+                         (session_id, now)).fetchone()
+        if row is None:
+            return None
+        if self.idle_timeout > 0:
+            with db:
+                db.execute("UPDATE sessions SET expires_at = ? "
+                           "WHERE session_id = ?",
+                           (self.deadline(row[1], now), session_id))
+        return row[0]
+
+    def delete(self, session_id: str) -> bool:
+        """Removes a session, returns False if it didn't exist"""
+        db = self.connection()
+        with db:
+            cursor = db.execute("DELETE FROM sessions WHERE session_id = ?",
+                                (session_id,))
+        return cursor.rowcount > 0
+
+
+class SharedMemorySessionStore(SessionStore):
+    """
+    Session store in a fixed-size open-addressing hash table kept in a
+    named shared memory segment, so every worker process of the host
+    sees the same sessions. Accesses serialize on a flock()ed lock file.
+
+    Each slot holds a state byte (empty, used or deleted), the Session
+    ID, the User ID, the creation time and the expiry time (0: never).
+    A session is stored at most `max_probe` slots after its hash slot,
+    so no lookup scans further. Removals shift the rest of the cluster
+    back instead of leaving deleted markers, so churn does not lengthen
+    the probes (deleted slots only come from older versions).
+    """
+
+    SLOT = struct.Struct('<B64s64sdd')
+    EMPTY, USED, DELETED = 0, 1, 2
+    max_probe = 256
+
+    def __init__(self, name: str, slots: int = 65536,
+                 ttl: int = 0, idle_timeout: int = 0):
+        super().__init__(ttl, idle_timeout)
+        self.slots = slots
+        size = slots * self.SLOT.size
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True,
+                                                  size=size)
+        except FileExistsError:
+            self.shm = shared_memory.SharedMemory(name)
+        # The segment outlives this process: other workers still use it
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        if self.shm.size < size:
+            raise ValueError("Shared memory segment {} is smaller than {} "
+                             "slots".format(name, slots))
+        self.lock_file = open('/tmp/{}.lock'.format(name), 'a')
+        self.thread_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        """Holds the table lock across threads and processes"""
+        with self.thread_lock:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def read(self, index: int) -> tuple:
+        """Returns the fields of a slot"""
+        return self.SLOT.unpack_from(self.shm.buf, index * self.SLOT.size)
+
+    def write(self, index: int, *fields) -> None:
+        """Overwrites the fields of a slot"""
+        self.SLOT.pack_into(self.shm.buf, index * self.SLOT.size, *fields)
+
+    def home(self, key: bytes) -> int:
+        """Returns the hash slot of a key"""
+        return zlib.crc32(key) % self.slots
+
+    def remove_at(self, index: int) -> None:
+        """
+        Empties a slot, shifting back the following sessions of its
+        cluster that may take its place, so no deleted marker is left
+        """
+        hole = index
+        for _ in range(self.slots - 1):
+            index = (index + 1) % self.slots
+            fields = self.read(index)
+            if fields[0] == self.EMPTY:
+                break
+            if fields[0] != self.USED:
+                continue
+            # The session may move back if the hole is on its probe path
+            home = self.home(fields[1].rstrip(b'\0'))
+            if (index - home) % self.slots >= (index - hole) % self.slots:
+                self.write(hole, *fields)
+                hole = index
+        self.write(hole, self.EMPTY, b'', b'', 0.0, 0.0)
+
+    def probe(self, key: bytes, now: float) -> tuple:
+        """
+        Returns the index of the live slot holding `key` (or None) and
+        the first free slot met on the way (or None), looking at most
+        `max_probe` slots. Expired slots met on the way are removed.
+        """
+        start = self.home(key)
+        free = None
+        i = 0
+        while i < min(self.max_probe, self.slots):
+            index = (start + i) % self.slots
+            state, slot_key, _, _, expires_at = self.read(index)
+            if state == self.EMPTY:
+                return None, free if free is not None else index
+            if state == self.USED and expires_at and expires_at <= now:
+                # Another session may have been shifted into the slot
+                self.remove_at(index)
+                continue
+            i += 1
+            if state == self.DELETED:
+                if free is None:
+                    free = index
+                continue
+            if slot_key.rstrip(b'\0') == key:
+                return index, free
+        return None, free
+
+    def encode(self, value: str) -> bytes:
+        """Encodes an ID to fit in a slot"""
+        key = value.encode()
+        if len(key) > 64:
+            raise ValueError("ID longer than 64 bytes: {}".format(value))
+        return key
+
+    def set(self, session_id: str, user_id: str) -> None:
+        """Stores a session"""
+        key = self.encode(session_id)
+        value = self.encode(user_id)
+        now = time.time()
+        expires_at = self.deadline(now, now) or 0.0
+        with self.locked():
+            index, free = self.probe(key, now)
+            if index is None:
+                index = free
+            if index is None:
+                raise MemoryError("No free slot in the shared session "
+                                  "table near {}".format(session_id))
+            self.write(index, self.USED, key, value, now, expires_at)
+
+    def get(self, session_id: str) -> str:
+        """Returns the User ID of a live session, or None"""
+        key = self.encode(session_id)
+        now = time.time()
+        with self.locked():
+            index, _ = self.probe(key, now)
+            if index is None:
+                return None
+            _, _, value, created_at, _ = self.read(index)
+            if self.idle_timeout > 0:
+                self.write(index, self.USED, key, value, created_at,
+                           self.deadline(created_at, now))
+        return value.rstrip(b'\0').decode()
+
+    def delete(self, session_id: str) -> bool:
+        """Removes a session, returns False if it didn't exist"""
+        key = self.encode(session_id)
+        with self.locked():
+            index, _ = self.probe(key, time.time())
+            if index is None:
+                return False
+            self.remove_at(index)
+            return True
+
+
+def session_store_from_env() -> SessionStore:
+    """
+    Builds the session store selected by SESSION_STORE ('memory',
+    'sqlite' or 'shm'), with SESSION_DURATION and SESSION_IDLE_TIMEOUT
+    in seconds
+    """
+    ttl = int(getenv('SESSION_DURATION', '0') or 0)
+    idle_timeout = int(getenv('SESSION_IDLE_TIMEOUT', '0') or 0)
+    if getenv('SESSION_STORE') == 'sqlite':
+        db_path = getenv('SESSION_DB_PATH', '.db_sessions.sqlite')
+        return SQLiteSessionStore(db_path, ttl, idle_timeout)
+    if getenv('SESSION_STORE') == 'shm':
+        name = getenv('SESSION_SHM_NAME', 'session_auth')
+        slots = int(getenv('SESSION_SHM_SLOTS', '65536'))
+        return SharedMemorySessionStore(name, slots, ttl, idle_timeout)
+    return MemorySessionStore(ttl, idle_timeout)
@@ -4,18 +4,109 @@
 """
 
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import abort, jsonify, request, Response
 from models.user import User
+import base64
+import bisect
+import json
+
+
+USERS_ORDERS = ('id', 'created_at')
+
+
+def _encode_cursor(key: tuple) -> str:
+    """ Opaque cursor pointing after a sort key
+    """
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """ Sort key of a cursor, ValueError if malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(key, list) or len(key) != 2 or \
+            not all(isinstance(item, str) for item in key):
+        raise ValueError("invalid cursor")
+    return tuple(key)
+
+
+def _project(user: User, fields: list) -> dict:
+    """ JSON representation of a user, restricted to fields if given
+    (names the user doesn't have are left out)
+    """
+    user_json = user.to_json()
+    if fields is None:
+        return user_json
+    return {k: user_json[k] for k in fields if k in user_json}
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (all optional):
+      - limit: page size; enables pagination
+      - cursor: next_cursor of the previous page; enables pagination
+      - order_by: id (default) or created_at
+      - fields: comma-separated attributes to return
+      - format: ndjson to stream one user per line
     Return:
       - list of all User objects JSON represented
+      - with pagination: {"data": [...], "next_cursor": ...}
+      - with format=ndjson: one User JSON per line, with a final
+        {"next_cursor": ...} line when paginated
+      - 400 if a parameter is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    order_by = request.args.get('order_by', 'id')
+    fields = request.args.get('fields')
+    ndjson = request.args.get('format') == 'ndjson'
+
+    if order_by not in USERS_ORDERS:
+        return jsonify({'error': "order_by must be id or created_at"}), 400
+    if fields is not None:
+        fields = [f for f in fields.split(',') if f and f[0] != '_']
+    paginate = limit is not None or cursor is not None
+    if not paginate:
+        users = User.all()
+    else:
+        try:
+            limit = int(limit) if limit is not None else 100
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+        try:
+            after = _decode_cursor(cursor) if cursor is not None else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # (order_by value, id) keys kept sorted by the model: a page
+        # costs O(log N + limit)
+        keys = User.ordered_keys(order_by)
+        start = bisect.bisect_right(keys, after) if after is not None else 0
+        keys = keys[start:start + limit + 1]
+        next_cursor = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = _encode_cursor(keys[-1])
+        users = [User.get(obj_id) for _, obj_id in keys]
+        users = [user for user in users if user is not None]
+
+    if ndjson:
+        def generate():
+            for user in users:
+                yield json.dumps(_project(user, fields)) + "\n"
+            if paginate:
+                yield json.dumps({'next_cursor': next_cursor}) + "\n"
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    data = [_project(user, fields) for user in users]
+    if paginate:
+        return jsonify({'data': data, 'next_cursor': next_cursor})
+    return jsonify(data)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
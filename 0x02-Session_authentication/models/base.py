@@ -3,18 +3,81 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
+from models.storage import storage_from_env
+from os import getenv
+import bisect
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+INDEXES = {}
+INDEXED_VALUES = {}
+ORDERS = {}
+ORDERED_KEYS = {}
+STORAGE = storage_from_env()
+LAZY_LOAD = getenv('MODEL_LAZY_LOAD') == '1'
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string, through the C fromisoformat
+    parser when possible (strptime is much slower)
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+class LazyObjects(dict):
+    """ Objects of a class keyed by ID, where loaded records stay JSON
+    dictionaries until first accessed
+    """
+
+    def __init__(self, cls):
+        """ Initialize a LazyObjects instance
+        """
+        super().__init__()
+        self.cls = cls
+
+    def __getitem__(self, obj_id: str):
+        """ Object of an ID, built from its record if needed
+        """
+        obj = super().__getitem__(obj_id)
+        if type(obj) is dict:
+            obj = self.cls(**obj)
+            super().__setitem__(obj_id, obj)
+        return obj
+
+    def get(self, obj_id: str, default=None):
+        """ Object of an ID, or default
+        """
+        if obj_id not in self:
+            return default
+        return self[obj_id]
+
+    def values(self):
+        """ All objects, building the pending ones as they are reached
+        """
+        return (self[obj_id] for obj_id in self)
+
+    def items(self):
+        """ All (ID, object) pairs, building the pending ones as they
+        are reached
+        """
+        return ((obj_id, self[obj_id]) for obj_id in self)
 
 
 class Base():
     """ Base class
+
+    Attributes are declared in __slots__ so that objects carry no
+    per-instance __dict__ (subclasses without __slots__ still get one)
     """
+    __slots__ = ('id', 'created_at', 'updated_at')
+    indexed_attributes = ()
+    ordered_attributes = ()
+    storage_format = 'json'
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
@@ -25,13 +88,11 @@ class Base():
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
@@ -48,7 +109,7 @@ class Base():
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._attributes():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -57,49 +118,161 @@ class Base():
                 result[key] = value
         return result
 
+    def _attributes(self) -> Iterable[tuple]:
+        """ (name, value) of every attribute set on the object
+        """
+        for klass in reversed(type(self).__mro__):
+            for key in klass.__dict__.get('__slots__', ()):
+                if key != '__dict__' and hasattr(self, key):
+                    yield key, getattr(self, key)
+        yield from getattr(self, '__dict__', {}).items()
+
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
+
+        With MODEL_LAZY_LOAD=1, objects are only built from their
+        records when first accessed
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        DATA[s_class] = LazyObjects(cls) if LAZY_LOAD else {}
+        INDEXES[s_class] = {}
+        INDEXED_VALUES[s_class] = {}
+        ORDERS[s_class] = {}
+        ORDERED_KEYS[s_class] = {}
+        for obj_id, obj_json in STORAGE.load(cls):
+            obj = obj_json if LAZY_LOAD else cls(**obj_json)
+            dict.__setitem__(DATA[s_class], obj_id, obj)
+            cls._index(obj_id, obj, False)
+        # Sorting once is much cheaper than inserting each key in order
+        for keys in ORDERS[s_class].values():
+            keys.sort()
+
+    @staticmethod
+    def _value(obj, attr: str):
+        """ Value of an attribute of an object or of its JSON record
+        """
+        if type(obj) is dict:
+            return obj.get(attr)
+        return getattr(obj, attr, None)
+
+    @staticmethod
+    def _order_key(obj_id: str, value) -> tuple:
+        """ (value, ID) ordering key, timestamps being compared in their
+        TIMESTAMP_FORMAT form and a missing value first
+        """
+        if value is None:
+            value = ""
+        elif type(value) is datetime:
+            # Same text as TIMESTAMP_FORMAT, without strftime's cost
+            value = value.isoformat(timespec='seconds')
+        return (value, obj_id)
+
+    @classmethod
+    def _index(cls, obj_id: str, obj, in_order: bool = True):
+        """ Add an object, or its JSON record, to the secondary indexes
+        and to the sorted keys of `ordered_attributes`. Unless in_order,
+        the object is new and its keys are appended, to be sorted by the
+        caller
+        """
+        s_class = cls.__name__
+        if in_order:
+            cls._unindex(obj_id)
+        if cls.ordered_attributes:
+            orders = ORDERS.setdefault(s_class, {})
+            keys = {}
+            for attr in cls.ordered_attributes:
+                key = cls._order_key(obj_id, cls._value(obj, attr))
+                if in_order:
+                    bisect.insort(orders.setdefault(attr, []), key)
+                else:
+                    orders.setdefault(attr, []).append(key)
+                keys[attr] = key
+            ORDERED_KEYS.setdefault(s_class, {})[obj_id] = keys
+        if len(cls.indexed_attributes) == 0:
+            return
+        indexes = INDEXES.setdefault(s_class, {})
+        values = {}
+        for attr in cls.indexed_attributes:
+            value = cls._value(obj, attr)
+            try:
+                ids = indexes.setdefault(attr, {}).setdefault(value, {})
+            except TypeError:
+                continue
+            ids[obj_id] = None
+            values[attr] = value
+        INDEXED_VALUES.setdefault(s_class, {})[obj_id] = values
+
+    @classmethod
+    def _unorder(cls, obj_id: str):
+        """ Remove an object ID from the sorted keys
+        """
+        s_class = cls.__name__
+        keys = ORDERED_KEYS.get(s_class, {}).pop(obj_id, None)
+        if keys is None:
             return
+        for attr, key in keys.items():
+            ordered = ORDERS[s_class][attr]
+            index = bisect.bisect_left(ordered, key)
+            if index < len(ordered) and ordered[index] == key:
+                del ordered[index]
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def _unindex(cls, obj_id: str):
+        """ Remove an object ID from the secondary indexes and the
+        sorted keys
+        """
+        cls._unorder(obj_id)
+        s_class = cls.__name__
+        values = INDEXED_VALUES.get(s_class, {}).pop(obj_id, None)
+        if values is None:
+            return
+        indexes = INDEXES[s_class]
+        for attr, value in values.items():
+            ids = indexes[attr].get(value, {})
+            ids.pop(obj_id, None)
+            if len(ids) == 0:
+                indexes[attr].pop(value, None)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        with STORAGE.write_lock:
+            # Only copy the table under the lock: serializing it there
+            # would stall every save() for the whole snapshot
+            with STORAGE.lock:
+                objs = dict.copy(DATA[s_class])
+            objs_json = {}
+            for obj_id, obj in objs.items():
+                if type(obj) is dict:
+                    objs_json[obj_id] = obj
+                else:
+                    objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            STORAGE.write_snapshot(cls, objs_json)
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with STORAGE.lock:
+            DATA[s_class][self.id] = self
+            self.__class__._index(self.id, self)
+        STORAGE.saved(self.__class__, self)
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
+        with STORAGE.lock:
+            if DATA[s_class].get(self.id) is None:
+                return
             del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+            self.__class__._unindex(self.id)
+        STORAGE.removed(self.__class__, self)
 
     @classmethod
     def count(cls) -> int:
@@ -114,6 +287,13 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def ordered_keys(cls, attr: str) -> List[tuple]:
+        """ (value, ID) keys of all objects sorted by an attribute listed
+        in `ordered_attributes`
+        """
+        return ORDERS.get(cls.__name__, {}).get(attr, [])
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
@@ -124,8 +304,23 @@ class Base():
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+
+        Uses a secondary index when an attribute of the query is listed
+        in `indexed_attributes`, otherwise scans all objects
         """
         s_class = cls.__name__
+        objs = DATA[s_class].values()
+        for k, v in attributes.items():
+            if k not in cls.indexed_attributes:
+                continue
+            try:
+                ids = INDEXES.get(s_class, {}).get(k, {}).get(v, {})
+            except TypeError:
+                continue
+            objs = [DATA[s_class][obj_id] for obj_id in ids
+                    if obj_id in DATA[s_class]]
+            break
+
         def _search(obj):
             if len(attributes) == 0:
                 return True
@@ -134,4 +329,4 @@ class Base():
                     return False
             return True
         
-        return list(filter(_search, DATA[s_class].values()))
+        return list(filter(_search, objs))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+""" Binary snapshot module
+
+Layout of a .db_<Class>.bin file (little endian):
+  - magic b'BDB2'
+  - u32 number of attribute names, then each name (u16 length + UTF-8)
+  - records until the end of the file, each made of:
+    u32 payload length, then for the object ID followed by every
+    attribute name of the table: one tag byte each, one u32 text length
+    (in characters) each, and finally the UTF-8 text of all the values
+
+Tags: absent, None, str, int, float, true, false, or JSON for anything
+else. Values are stored as text so that a record is decoded with a
+single UTF-8 decode and plain slicing.
+"""
+from typing import Iterator, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+
+MAGIC = b'BDB2'
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+ABSENT, NONE, STR, INT, FLOAT, TRUE, FALSE, JSON = range(8)
+
+
+def _encode(value) -> Tuple[int, str]:
+    """ Tag and text of a value
+    """
+    if value is None:
+        return NONE, ''
+    if type(value) is str:
+        return STR, value
+    if type(value) is bool:
+        return (TRUE if value else FALSE), ''
+    if type(value) is int:
+        return INT, str(value)
+    if type(value) is float:
+        return FLOAT, repr(value)
+    return JSON, json.dumps(value)
+
+
+def dump(objs_json: dict, f):
+    """ Write {ID: JSON dictionary} to a binary file object
+    """
+    names = []
+    seen = set()
+    for obj_json in objs_json.values():
+        for name in obj_json:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+
+    f.write(MAGIC)
+    f.write(U32.pack(len(names)))
+    for name in names:
+        data = name.encode()
+        f.write(U16.pack(len(data)))
+        f.write(data)
+
+    lengths = struct.Struct('<{}I'.format(len(names) + 1))
+    for obj_id, obj_json in objs_json.items():
+        tags = [STR]
+        texts = [obj_id]
+        for name in names:
+            if name in obj_json:
+                tag, text = _encode(obj_json[name])
+            else:
+                tag, text = ABSENT, ''
+            tags.append(tag)
+            texts.append(text)
+        payload = bytes(tags) + \
+            lengths.pack(*[len(text) for text in texts]) + \
+            ''.join(texts).encode()
+        f.write(U32.pack(len(payload)))
+        f.write(payload)
+
+
+def load(file_path: str) -> Iterator[Tuple[str, dict]]:
+    """ Yield the (ID, JSON dictionary) pairs of a binary file, read
+    through a memory map
+    """
+    if os.path.getsize(file_path) == 0:
+        return
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _load(mm, file_path)
+
+
+def _load(buf, file_path: str) -> Iterator[Tuple[str, dict]]:
+    """ Yield the (ID, JSON dictionary) pairs of a binary buffer
+    """
+    if buf[:4] != MAGIC:
+        raise ValueError("{} is not a binary snapshot".format(file_path))
+    count, = U32.unpack_from(buf, 4)
+    offset = 8
+    names = []
+    for _ in range(count):
+        length, = U16.unpack_from(buf, offset)
+        offset += 2
+        names.append(str(buf[offset:offset + length], 'utf-8'))
+        offset += length
+
+    size = len(buf)
+    n = len(names) + 1
+    lengths = struct.Struct('<{}I'.format(n))
+    while offset < size:
+        length, = U32.unpack_from(buf, offset)
+        offset += 4
+        end = offset + length
+        tags = buf[offset:offset + n]
+        text_lengths = lengths.unpack_from(buf, offset + n)
+        text = str(buf[offset + n + lengths.size:end], 'utf-8')
+        obj_id = text[:text_lengths[0]]
+        position = text_lengths[0]
+        obj_json = {}
+        for i in range(1, n):
+            tag = tags[i]
+            if tag == ABSENT:
+                continue
+            value = text[position:position + text_lengths[i]]
+            position += text_lengths[i]
+            if tag == NONE:
+                value = None
+            elif tag == INT:
+                value = int(value)
+            elif tag == FLOAT:
+                value = float(value)
+            elif tag == TRUE or tag == FALSE:
+                value = tag == TRUE
+            elif tag == JSON:
+                value = json.loads(value)
+            elif tag != STR:
+                raise ValueError("Unknown tag {} in {}".format(tag,
+                                                               file_path))
+            obj_json[names[i - 1]] = value
+        offset = end
+        yield obj_id, obj_json
+
+
+def convert(json_path: str, bin_path: str):
+    """ Convert a .db_<Class>.json snapshot to the binary format
+    """
+    with open(json_path, 'r') as f:
+        objs_json = json.load(f)
+    with open(bin_path, 'wb') as f:
+        dump(objs_json, f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python3 -m models.snapshot .db_User.json .db_User.bin")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+from os import getenv, path
+from typing import Iterable, Iterator, Tuple
+from models import snapshot
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Read once, at import: os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _skip(text: str, index: int) -> int:
+    """ Index of the first non-whitespace character from index
+    """
+    while text[index] in ' \t\n\r':
+        index += 1
+    return index
+
+
+def _atomic_write(file_path: str, mode: str, write):
+    """ Write a file through write(f) on a temporary file of the same
+    directory, fsync it and rename it over file_path, so that a crash
+    leaves either the old or the new content, never a truncated file.
+    The file keeps its mode, or gets the one open() would give it
+    """
+    directory = path.dirname(path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=path.basename(file_path) + '.',
+                                    suffix='.tmp', dir=directory)
+    try:
+        try:
+            file_mode = os.stat(file_path).st_mode & 0o7777
+        except FileNotFoundError:
+            file_mode = 0o666 & ~_UMASK
+        with os.fdopen(fd, mode) as f:
+            # mkstemp creates the file with mode 0600
+            os.fchmod(f.fileno(), file_mode)
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class FileStorage():
+    """ Storage rewriting the whole snapshot file on every mutation
+
+    The snapshot is .db_<Class>.json, or .db_<Class>.bin in the binary
+    format of models.snapshot for classes whose storage_format is
+    'binary' or which are listed in `binary_classes`.
+
+    With a `flush_interval` (in seconds), mutations only mark their class
+    dirty and a background thread rewrites the dirty snapshots at most
+    once per interval; flush() writes them right away and runs at exit.
+    `lock` guards DATA while a snapshot is taken, `write_lock` orders the
+    snapshot writes.
+    """
+
+    def __init__(self, binary_classes: Iterable[str] = (),
+                 flush_interval: float = 0):
+        """ Initialize a FileStorage instance
+        """
+        self.binary_classes = set(binary_classes)
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()
+        self.dirty = {}
+        self.flusher = None
+
+    def is_binary(self, cls) -> bool:
+        """ Whether the snapshot of a class uses the binary format
+        """
+        return cls.__name__ in self.binary_classes or \
+            getattr(cls, 'storage_format', 'json') == 'binary'
+
+    def file_path(self, cls) -> str:
+        """ Path of the snapshot file of a class
+        """
+        if self.is_binary(cls):
+            return ".db_{}.bin".format(cls.__name__)
+        return ".db_{}.json".format(cls.__name__)
+
+    def write_snapshot(self, cls, objs_json: dict):
+        """ Write the snapshot of a class from {ID: JSON dictionary}
+        """
+        if self.is_binary(cls):
+            _atomic_write(self.file_path(cls), 'wb',
+                          lambda f: snapshot.dump(objs_json, f))
+        else:
+            _atomic_write(self.file_path(cls), 'w',
+                          lambda f: json.dump(objs_json, f))
+
+    def load(self, cls) -> Iterator[Tuple[str, dict]]:
+        """ Yield the stored (ID, JSON dictionary) pairs of a class
+
+        A binary snapshot is read through a memory map; a JSON one is
+        decoded one record at a time, so the records are never all held
+        in one dictionary. A class switched to the binary format is
+        loaded from its JSON snapshot until the first save
+        """
+        file_path = self.file_path(cls)
+        if self.is_binary(cls):
+            if path.exists(file_path):
+                yield from snapshot.load(file_path)
+                return
+            file_path = ".db_{}.json".format(cls.__name__)
+        if not path.exists(file_path):
+            return
+        with open(file_path, 'r') as f:
+            text = f.read()
+        decoder = json.JSONDecoder()
+        index = _skip(text, 0)
+        if text[index] != '{':
+            raise ValueError("{} is not a JSON object".format(file_path))
+        index = _skip(text, index + 1)
+        while text[index] != '}':
+            obj_id, index = decoder.raw_decode(text, index)
+            index = _skip(text, index)
+            if text[index] != ':':
+                raise ValueError("Expected ':' in {} at {}"
+                                 .format(file_path, index))
+            obj_json, index = decoder.raw_decode(text, _skip(text, index + 1))
+            yield obj_id, obj_json
+            index = _skip(text, index)
+            if text[index] == ',':
+                index = _skip(text, index + 1)
+
+    def mark_dirty(self, cls):
+        """ Schedule the snapshot of a class for the next flush
+        """
+        with self.lock:
+            self.dirty[cls.__name__] = cls
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._run_flusher,
+                                                name="storage-flusher",
+                                                daemon=True)
+                self.flusher.start()
+
+    def _run_flusher(self):
+        """ Flush the dirty snapshots once per flush interval, forever
+        """
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # Keep flushing; the classes stay dirty for the next round
+                logger.exception("Flushing the model snapshots failed")
+
+    def flush(self):
+        """ Write the snapshot of every dirty class now
+        """
+        with self.lock:
+            dirty = list(self.dirty.values())
+            self.dirty.clear()
+        for i, cls in enumerate(dirty):
+            try:
+                cls.save_to_file()
+            except BaseException:
+                with self.lock:
+                    for pending in dirty[i:]:
+                        self.dirty.setdefault(pending.__name__, pending)
+                raise
+
+    def saved(self, cls, obj):
+        """ Persist an object after it has been created or updated
+        """
+        if self.flush_interval:
+            self.mark_dirty(cls)
+        else:
+            cls.save_to_file()
+
+    def removed(self, cls, obj):
+        """ Persist the removal of an object
+        """
+        if self.flush_interval:
+            self.mark_dirty(cls)
+        else:
+            cls.save_to_file()
+
+
+class JournalStorage(FileStorage):
+    """ Storage appending one record per mutation to .db_<Class>.journal
+
+    The snapshot (.db_<Class>.json) is only rewritten when the journal
+    reaches `compact_every` records, so a mutation costs O(1) writes.
+    On load, the snapshot is read and the journal tail replayed over it.
+    `journal_lock` is held from appending a record through compaction,
+    so no record is truncated away before it is in the snapshot.
+    """
+
+    def __init__(self, compact_every: int = 1000,
+                 binary_classes: Iterable[str] = ()):
+        """ Initialize a JournalStorage instance
+        """
+        super().__init__(binary_classes)
+        self.compact_every = compact_every
+        self.journal_sizes = {}
+        self.journal_lock = threading.RLock()
+
+    def journal_path(self, cls) -> str:
+        """ Path of the journal file of a class
+        """
+        return ".db_{}.journal".format(cls.__name__)
+
+    def load(self, cls) -> Iterator[Tuple[str, dict]]:
+        """ Return the snapshot pairs of a class with its journal replayed
+        """
+        objs_json = dict(super().load(cls))
+        size = 0
+        journal_path = self.journal_path(cls)
+        if path.exists(journal_path):
+            with open(journal_path, 'rb+') as f:
+                end = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("Unterminated record")
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last record after a crash: cut it off, or
+                        # the next record would be appended to its line
+                        f.truncate(end)
+                        break
+                    if record.get('op') == 'remove':
+                        objs_json.pop(record.get('id'), None)
+                    else:
+                        objs_json[record.get('id')] = record.get('obj')
+                    end += len(line)
+                    size += 1
+        self.journal_sizes[cls.__name__] = size
+        return iter(objs_json.items())
+
+    def append(self, cls, record: dict):
+        """ Append a record to the journal, compacting it when full
+        """
+        line = json.dumps(record) + "\n"
+        with self.journal_lock:
+            with open(self.journal_path(cls), 'a') as f:
+                f.write(line)
+            size = self.journal_sizes.get(cls.__name__, 0) + 1
+            self.journal_sizes[cls.__name__] = size
+            if size >= self.compact_every:
+                self.compact(cls)
+
+    def compact(self, cls):
+        """ Fold the journal into a new snapshot and truncate it
+        """
+        with self.journal_lock:
+            cls.save_to_file()
+            open(self.journal_path(cls), 'w').close()
+            self.journal_sizes[cls.__name__] = 0
+
+    def saved(self, cls, obj):
+        """ Journal an object after it has been created or updated
+        """
+        self.append(cls, {'op': 'save', 'id': obj.id,
+                          'obj': obj.to_json(True)})
+
+    def removed(self, cls, obj):
+        """ Journal the removal of an object
+        """
+        self.append(cls, {'op': 'remove', 'id': obj.id})
+
+
+def storage_from_env() -> FileStorage:
+    """ Build the storage selected by the MODEL_STORAGE environment variable,
+    with binary snapshots for the classes listed in MODEL_BINARY_CLASSES.
+    MODEL_FLUSH_INTERVAL_MS > 0 turns on write-behind snapshots
+    """
+    binary_classes = [name for name in
+                      getenv('MODEL_BINARY_CLASSES', '').split(',') if name]
+    if getenv('MODEL_STORAGE') == 'journal':
+        compact_every = int(getenv('MODEL_JOURNAL_COMPACT', '1000'))
+        return JournalStorage(compact_every, binary_classes)
+    flush_interval = int(getenv('MODEL_FLUSH_INTERVAL_MS', '0')) / 1000
+    storage = FileStorage(binary_classes, flush_interval)
+    if flush_interval:
+        atexit.register(storage.flush)
+    return storage
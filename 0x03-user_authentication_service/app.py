@@ -3,12 +3,21 @@
 """
 from flask import Flask, jsonify, request, redirect, abort, make_response
 from auth import Auth
+from hasher import HashingPoolSaturated, hashing_pool_from_env
+from session_cache import session_cache_from_env
 
-AUTH = Auth()
+AUTH = Auth(hashing_pool_from_env(), session_cache_from_env())
 
 app = Flask(__name__)
 
 
+@app.teardown_appcontext
+def close_db_session(exception=None) -> None:
+    """Releases the database session of the request.
+    """
+    AUTH._db.close_session()
+
+
 @app.route("/", methods=['GET'], strict_slashes=False)
 def index() -> str:
     """Index route returning a welcome message.
@@ -19,6 +28,19 @@ def index() -> str:
     return jsonify({"message": "Bienvenue"})
 
 
+@app.route("/stats", methods=['GET'], strict_slashes=False)
+def stats() -> str:
+    """Cache statistics route.
+
+    Returns:
+        str: A JSON payload with the session cache hit/miss counters.
+    """
+    stats = {}
+    if AUTH._session_cache is not None:
+        stats["session_cache"] = AUTH._session_cache.stats()
+    return jsonify(stats)
+
+
 @app.route("/users", methods=['POST'], strict_slashes=False)
 def users() -> str:
     """User registration route.
@@ -62,7 +84,7 @@ def logout():
     Destroys the user's session and redirects to the index route.
     """
     session_id = request.cookies.get('session_id')
-    user = AUTH.get_user_from_session_id(session_id)
+    user = AUTH.get_session_user(session_id)
     if not user:
         abort(403)
     AUTH.destroy_session(user.id)
@@ -77,7 +99,7 @@ def profile():
         str: User's email if logged in, 403 otherwise.
     """
     session_id = request.cookies.get("session_id")
-    user = AUTH.get_user_from_session_id(session_id)
+    user = AUTH.get_session_user(session_id)
 
     if user:
         return jsonify({"email": user.email}), 200
@@ -115,5 +137,15 @@ def update_password():
         abort(403)
 
 
+@app.errorhandler(HashingPoolSaturated)
+def hashing_pool_saturated(error) -> str:
+    """Too many password hashes in flight.
+
+    Returns:
+        str: A JSON payload with a 503 status code.
+    """
+    return jsonify({"message": "server busy, retry later"}), 503
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port="5000")
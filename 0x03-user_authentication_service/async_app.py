@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""ASGI app module, the asyncio counterpart of app.py
+
+Run with any ASGI server, e.g. `hypercorn async_app:app`.
+"""
+from quart import Quart, jsonify, request, redirect, abort, make_response
+from async_auth import AsyncAuth
+
+AUTH = AsyncAuth()
+
+app = Quart(__name__)
+
+
+@app.before_serving
+async def create_tables() -> None:
+    """Creates the database tables before serving requests.
+    """
+    await AUTH._db.create_all()
+
+
+@app.after_serving
+async def close_db() -> None:
+    """Releases the database connections on shutdown.
+    """
+    await AUTH._db.close()
+
+
+@app.route("/", methods=['GET'], strict_slashes=False)
+async def index() -> str:
+    """Index route returning a welcome message.
+
+    Returns:
+        str: A JSON payload with a welcome message.
+    """
+    return jsonify({"message": "Bienvenue"})
+
+
+@app.route("/users", methods=['POST'], strict_slashes=False)
+async def users() -> str:
+    """User registration route.
+
+    Returns:
+        str: A JSON payload indicating user creation status.
+    """
+    form = await request.form
+    email = form.get('email')
+    password = form.get('password')
+
+    try:
+        user = await AUTH.register_user(email, password)
+        return jsonify({"email": user.email, "message": "user created"})
+    except ValueError:
+        return jsonify({"message": "email already registered"}), 400
+
+
+@app.route("/sessions", methods=['POST'], strict_slashes=False)
+async def login() -> str:
+    """User login route.
+
+    Returns:
+        str: A JSON payload with login status and sets a session cookie.
+    """
+    form = await request.form
+    email = form.get('email')
+    password = form.get('password')
+
+    if not await AUTH.valid_login(email, password):
+        abort(401)
+
+    session_id = await AUTH.create_session(email)
+    response = await make_response(
+        jsonify({"email": email, "message": "logged in"}))
+    response.set_cookie("session_id", session_id)
+    return response
+
+
+@app.route("/sessions", methods=['DELETE'], strict_slashes=False)
+async def logout():
+    """User logout route.
+
+    Destroys the user's session and redirects to the index route.
+    """
+    session_id = request.cookies.get('session_id')
+    user = await AUTH.get_user_from_session_id(session_id)
+    if not user:
+        abort(403)
+    await AUTH.destroy_session(user.id)
+    return redirect("/")
+
+
+@app.route('/profile', methods=['GET'], strict_slashes=False)
+async def profile():
+    """User profile route.
+
+    Returns:
+        str: User's email if logged in, 403 otherwise.
+    """
+    session_id = request.cookies.get("session_id")
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user:
+        return jsonify({"email": user.email}), 200
+    else:
+        abort(403)
+
+
+@app.route('/reset_password', methods=['POST'], strict_slashes=False)
+async def get_reset_password_token():
+    """Reset password token route.
+
+    Returns:
+        str: Reset token if email is registered, 403 otherwise.
+    """
+    try:
+        email = (await request.form).get('email')
+        reset_token = await AUTH.get_reset_password_token(email)
+        return jsonify({"email": email, "reset_token": reset_token}), 200
+    except ValueError:
+        abort(403)
+
+
+@app.route('/reset_password', methods=['PUT'], strict_slashes=False)
+async def update_password():
+    """Updates the user password.
+    """
+    form = await request.form
+    email = form.get('email')
+    reset_token = form.get('reset_token')
+    new_password = form.get('new_password')
+
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return jsonify({"email": email, "message": "Password updated"}), 200
+    except ValueError:
+        abort(403)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Async Auth module
+"""
+import asyncio
+from concurrent.futures import Executor
+
+from sqlalchemy.orm.exc import NoResultFound
+
+from async_db import AsyncDB
+from auth import _generate_uuid
+from hasher import _checkpw, _hashpw
+from user import User
+
+
+class AsyncAuth:
+    """AsyncAuth class, the asyncio counterpart of Auth.
+
+    bcrypt work runs in `executor` (the loop's default thread pool when
+    None), so the event loop keeps serving other clients meanwhile.
+    """
+
+    def __init__(self, db: AsyncDB = None, executor: Executor = None):
+        """Initialize a new AsyncAuth instance
+
+        Args:
+            db (AsyncDB): The database, defaults to AsyncDB().
+            executor (Executor): Where to run bcrypt.
+        """
+        self._db = db if db is not None else AsyncDB()
+        self._executor = executor
+
+    async def _hash_password(self, password: str) -> bytes:
+        """Hashes a password off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _hashpw, password)
+
+    async def _check_password(self, password: str,
+                              hashed_password: bytes) -> bool:
+        """Checks a password off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _checkpw,
+                                          password, hashed_password)
+
+    async def register_user(self, email: str, password: str) -> User:
+        """Registers a new user.
+
+        Args:
+            email (str): The user's email address.
+            password (str): The user's password.
+
+        Returns:
+            User: The newly created user object.
+
+        Raises:
+            ValueError: If a user with the given email already exists.
+        """
+        try:
+            await self._db.find_user_by(email=email)
+            raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            hashed_password = await self._hash_password(password)
+            return await self._db.add_user(email, hashed_password.decode())
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """Validates user login credentials.
+
+        Args:
+            email (str): The user's email address.
+            password (str): The user's password.
+
+        Returns:
+            bool: True if the credentials are valid, False otherwise.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+        return await self._check_password(password,
+                                          user.hashed_password.encode())
+
+    async def create_session(self, email: str) -> str:
+        """Creates a new session for a user.
+
+        Args:
+            email (str): The user's email address.
+
+        Returns:
+            str: The session ID, or None if the user is not found.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+        session_id = _generate_uuid()
+        await self._db.update_user(user.id, session_id=session_id)
+        return session_id
+
+    async def get_user_from_session_id(self, session_id: str) -> User:
+        """Retrieves a user from the database based on session ID.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            User: The user object if found, None otherwise.
+        """
+        if not session_id:
+            return None
+        try:
+            return await self._db.find_user_by(session_id=session_id)
+        except NoResultFound:
+            return None
+
+    async def destroy_session(self, user_id: int) -> None:
+        """Destroys a user's session.
+
+        Args:
+            user_id (int): The ID of the user
+            whose session should be destroyed.
+        """
+        await self._db.update_user(user_id, session_id=None)
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """Generates a reset password token for a user.
+
+        Args:
+            email (str): The user's email address.
+
+        Returns:
+            str: The reset password token.
+
+        Raises:
+            ValueError: If no user with the given email is found.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            raise ValueError(f"No user found with email: {email}")
+        reset_token = _generate_uuid()
+        await self._db.update_user(user.id, reset_token=reset_token)
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """Updates a user's password.
+
+        Args:
+            reset_token (str): The reset password token.
+            password (str): The new password.
+
+        Raises:
+            ValueError: If the reset token is invalid or no user is found.
+        """
+        try:
+            user = await self._db.find_user_by(reset_token=reset_token)
+        except NoResultFound:
+            raise ValueError("Invalid reset token")
+        hashed_password = await self._hash_password(password)
+        await self._db.update_user(
+            user.id,
+            hashed_password=hashed_password.decode(),
+            reset_token=None
+        )
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Async DB module
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from user import Base, User
+
+
+class AsyncDB:
+    """AsyncDB class, the asyncio counterpart of DB
+    """
+
+    def __init__(self, url: str = "sqlite+aiosqlite:///a.db") -> None:
+        """Initialize a new AsyncDB instance
+
+        Args:
+            url (str): Database URL with an async driver.
+        """
+        self._engine = create_async_engine(url)
+        self._sessionmaker = async_sessionmaker(self._engine,
+                                                expire_on_commit=False)
+
+    async def create_all(self) -> None:
+        """Creates the tables that don't exist yet.
+        """
+        async with self._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """Adds a new user to the database.
+
+        Args:
+            email (str): The user's email address.
+            hashed_password (str): The user's hashed password.
+
+        Returns:
+            User: The newly created user object.
+        """
+        new_user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(new_user)
+            await session.commit()
+        return new_user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """Finds a user in the database based on given criteria.
+
+        Args:
+            **kwargs: Keyword arguments representing the search criteria.
+
+        Returns:
+            User: The user object if found.
+
+        Raises:
+            NoResultFound: If no user is found matching the criteria.
+            InvalidRequestError: If the query arguments are invalid.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(select(User).filter_by(**kwargs))
+            return result.scalar_one()
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """Updates a user's attributes in the database.
+
+        Args:
+            user_id (int): The ID of the user to update.
+            **kwargs: Keyword arguments representing the attributes to update.
+
+        Raises:
+            ValueError: If an invalid attribute is passed for update.
+            NoResultFound: If no user is found with the given ID.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(select(User).filter_by(id=user_id))
+            user = result.scalar_one()
+            for key, value in kwargs.items():
+                if hasattr(user, key):
+                    setattr(user, key, value)
+                else:
+                    raise ValueError(
+                        f"Invalid attribute for User model: {key}")
+            await session.commit()
+
+    async def close(self) -> None:
+        """
+        disposes of the engine's connections
+        """
+        await self._engine.dispose()
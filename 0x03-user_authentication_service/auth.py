@@ -3,7 +3,10 @@
 """
 import bcrypt
 import uuid
+from typing import Iterable, Tuple
 from db import DB
+from hasher import HashingPool
+from session_cache import SessionCache, SessionUser
 from user import User
 from sqlalchemy.orm.exc import NoResultFound
 
@@ -33,10 +36,34 @@ class Auth:
     """Auth class to interact with the authentication database.
     """
 
-    def __init__(self):
+    def __init__(self, hasher: HashingPool = None,
+                 session_cache: SessionCache = None):
         """Initialize a new Auth instance
+
+        Args:
+            hasher (HashingPool): Pool running the bcrypt work, or None
+                to hash on the calling thread.
+            session_cache (SessionCache): Cache in front of the session
+                lookups of get_session_user, or None to always query the
+                database.
         """
         self._db = DB()
+        self._hasher = hasher
+        self._session_cache = session_cache
+
+    def _hash_password(self, password: str) -> bytes:
+        """Hashes a password, in the hashing pool if there is one.
+        """
+        if self._hasher is None:
+            return _hash_password(password)
+        return self._hasher.hashpw(password)
+
+    def _check_password(self, password: str, hashed_password: bytes) -> bool:
+        """Checks a password, in the hashing pool if there is one.
+        """
+        if self._hasher is None:
+            return bcrypt.checkpw(password.encode(), hashed_password)
+        return self._hasher.checkpw(password, hashed_password)
 
     def register_user(self, email: str, password: str) -> User:
         """Registers a new user.
@@ -55,10 +82,52 @@ class Auth:
             self._db.find_user_by(email=email)
             raise ValueError(f"User {email} already exists")
         except NoResultFound:
-            hashed_password = _hash_password(password)
+            hashed_password = self._hash_password(password)
             new_user = self._db.add_user(email, hashed_password.decode())
             return new_user
 
+    def register_users_bulk(self, users: Iterable[Tuple[str, str]],
+                            batch_size: int = 1000) -> int:
+        """Registers many users, skipping the emails already registered.
+
+        Passwords are hashed in parallel across processes (the hashing
+        pool, or a temporary one sized to the CPU count) and users are
+        inserted in one transaction per batch.
+
+        Args:
+            users (Iterable[Tuple[str, str]]): (email, password) pairs.
+            batch_size (int): Users hashed and inserted per batch.
+
+        Returns:
+            int: The number of users registered.
+        """
+        hasher = self._hasher if self._hasher is not None else HashingPool()
+        registered = 0
+        try:
+            batch = {}
+            for email, password in users:
+                batch.setdefault(email, password)
+                if len(batch) >= batch_size:
+                    registered += self._register_batch(hasher, batch)
+                    batch = {}
+            if batch:
+                registered += self._register_batch(hasher, batch)
+        finally:
+            if hasher is not self._hasher:
+                hasher.shutdown()
+        return registered
+
+    def _register_batch(self, hasher: HashingPool, users: dict) -> int:
+        """Hashes and inserts an {email: password} batch, leaving out the
+        emails already registered before spending bcrypt time on them.
+        """
+        existing = self._db.existing_emails(users)
+        emails = [email for email in users if email not in existing]
+        hashed = hasher.hashpw_many([users[email] for email in emails])
+        return self._db.add_users_bulk(
+            zip(emails, (h.decode() for h in hashed)),
+            batch_size=len(emails) or 1, check_existing=False)
+
     def valid_login(self, email: str, password: str) -> bool:
         """Validates user login credentials.
 
@@ -72,7 +141,7 @@ class Auth:
         try:
             user = self._db.find_user_by(email=email)
             hashed_password = user.hashed_password.encode()
-            return bcrypt.checkpw(password.encode(), hashed_password)
+            return self._check_password(password, hashed_password)
         except NoResultFound:
             return False
 
@@ -86,9 +155,11 @@ class Auth:
             str: The session ID, or None if the user is not found.
         """
         try:
-            user = self._db.find_user_by(email=email)
             session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
+            user_id = self._db.update_user_by_email(email,
+                                                    session_id=session_id)
+            if self._session_cache is not None:
+                self._session_cache.put(session_id, user_id, email)
             return session_id
         except NoResultFound:
             return None
@@ -105,11 +176,33 @@ class Auth:
         if not session_id:
             return None
         try:
-            user = self._db.find_user_by(session_id=session_id)
-            return user
+            return self._db.find_user_by(session_id=session_id)
         except NoResultFound:
             return None
 
+    def get_session_user(self, session_id: str) -> SessionUser:
+        """Retrieves the id and email of a session's user, from the
+        session cache if there is one.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            SessionUser: The user's id and email if found, None otherwise.
+        """
+        if not session_id:
+            return None
+        if self._session_cache is not None:
+            cached = self._session_cache.get(session_id)
+            if cached is not None:
+                return cached
+        user = self.get_user_from_session_id(session_id)
+        if user is None:
+            return None
+        if self._session_cache is not None:
+            self._session_cache.put(session_id, user.id, user.email)
+        return SessionUser(user.id, user.email)
+
     def destroy_session(self, user_id: int) -> None:
         """Destroys a user's session.
 
@@ -118,6 +211,8 @@ class Auth:
             whose session should be destroyed.
         """
         self._db.update_user(user_id, session_id=None)
+        if self._session_cache is not None:
+            self._session_cache.invalidate_user(user_id)
 
     def get_reset_password_token(self, email: str) -> str:
         """Generates a reset password token for a user.
@@ -132,9 +227,8 @@ class Auth:
             ValueError: If no user with the given email is found.
         """
         try:
-            user = self._db.find_user_by(email=email)
             reset_token = _generate_uuid()
-            self._db.update_user(user.id, reset_token=reset_token)
+            self._db.update_user_by_email(email, reset_token=reset_token)
             return reset_token
         except NoResultFound:
             raise ValueError(f"No user found with email: {email}")
@@ -151,11 +245,13 @@ class Auth:
         """
         try:
             user = self._db.find_user_by(reset_token=reset_token)
-            hashed_password = _hash_password(password)
+            hashed_password = self._hash_password(password)
             self._db.update_user(
                 user.id,
                 hashed_password=hashed_password.decode(),
                 reset_token=None
             )
+            if self._session_cache is not None:
+                self._session_cache.invalidate_user(user.id)
         except NoResultFound:
             raise ValueError("Invalid reset token")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Bulk user import module
+
+Usage: ./bulk_import.py FILE [--format csv|jsonl] [--batch-size N]
+                             [--workers N]
+
+FILE holds one user per line: `email,password` rows (an optional
+`email,password` header is skipped) or `{"email": ..., "password": ...}`
+JSON lines. Use `-` to read standard input.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Iterator, TextIO, Tuple
+
+from auth import Auth
+from hasher import HashingPool
+
+
+def read_users_csv(stream: TextIO) -> Iterator[Tuple[str, str]]:
+    """Yields (email, password) pairs from CSV rows.
+    """
+    for row in csv.reader(stream):
+        if len(row) < 2 or row[:2] == ["email", "password"]:
+            continue
+        yield row[0].strip(), row[1]
+
+
+def read_users_jsonl(stream: TextIO) -> Iterator[Tuple[str, str]]:
+    """Yields (email, password) pairs from JSON lines.
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield record["email"], record["password"]
+
+
+def main() -> None:
+    """Imports the users of a file and reports the rows/second.
+    """
+    parser = argparse.ArgumentParser(description="Bulk import users")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=("csv", "jsonl"))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "jsonl" if args.file.endswith((".jsonl", ".json")) else "csv"
+    reader = read_users_jsonl if fmt == "jsonl" else read_users_csv
+
+    stream = sys.stdin if args.file == "-" else open(args.file, newline="")
+    hasher = HashingPool(args.workers)
+    try:
+        auth = Auth(hasher)
+        start = time.perf_counter()
+        registered = auth.register_users_bulk(reader(stream),
+                                              args.batch_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        hasher.shutdown()
+        stream.close()
+
+    print(f"{registered} users imported in {elapsed:.2f}s "
+          f"({registered / elapsed if elapsed else 0:.1f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
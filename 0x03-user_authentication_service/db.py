@@ -1,36 +1,117 @@
 #!/usr/bin/env python3
 """DB module
 """
-from sqlalchemy import create_engine
+import logging
+import os
+import random
+
+from typing import Iterable, Set, Tuple
+
+from sqlalchemy import create_engine, event, insert, select, update
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.pool import StaticPool
 
 from user import Base, User
 
+sql_logger = logging.getLogger("db.sql")
+
+USER_COLUMNS = frozenset(User.__table__.columns.keys())
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Reads a boolean environment variable ("1", "true", "yes", "on").
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Lets readers run alongside a writer (WAL) and makes writers wait
+    for the lock instead of failing right away (busy_timeout).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _sampled_sql_logger(sample_rate: float):
+    """Returns a before_cursor_execute listener sending a sample of the
+    statements to the "db.sql" debug logger.
+    """
+    def log_statement(conn, cursor, statement, parameters, context,
+                      executemany) -> None:
+        if sql_logger.isEnabledFor(logging.DEBUG) and \
+                random.random() < sample_rate:
+            sql_logger.debug("%s %r", statement, parameters)
+    return log_statement
+
 
 class DB:
     """DB class
+
+    Configured by environment variables:
+        AUTH_DB_URL: database URL (default: sqlite:///a.db)
+        AUTH_DB_RESET: drop all tables on start (default: off)
+        AUTH_DB_CREATE: create missing tables on start (default: on)
+        AUTH_DB_MIGRATE: add missing indexes on start (default: on)
+        AUTH_DB_ECHO: log SQL to the "db.sql" debug logger (default: off)
+        AUTH_DB_ECHO_SAMPLE: fraction of statements logged (default: 1)
     """
 
-    def __init__(self) -> None:
+    def __init__(self, pool_size: int = 5, max_overflow: int = 10) -> None:
         """Initialize a new DB instance
+
+        Args:
+            pool_size (int): Connections kept open in the pool.
+            max_overflow (int): Extra connections allowed under load.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=True)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        url = os.getenv("AUTH_DB_URL", "sqlite:///a.db")
+        connect_args = {}
+        pool_args = {"pool_size": pool_size, "max_overflow": max_overflow}
+        if url.startswith("sqlite"):
+            connect_args["check_same_thread"] = False
+            if make_url(url).database in (None, "", ":memory:"):
+                # Each connection would open its own empty database:
+                # share a single one across threads instead
+                pool_args = {"poolclass": StaticPool}
+        self._engine = create_engine(
+            url, pool_pre_ping=True, connect_args=connect_args, **pool_args
+        )
+        if url.startswith("sqlite"):
+            event.listen(self._engine, "connect", _set_sqlite_pragmas)
+        if _env_flag("AUTH_DB_ECHO", False):
+            sample_rate = float(os.getenv("AUTH_DB_ECHO_SAMPLE", "1"))
+            event.listen(self._engine, "before_cursor_execute",
+                         _sampled_sql_logger(sample_rate))
+        if _env_flag("AUTH_DB_RESET", False):
+            Base.metadata.drop_all(self._engine)
+        if _env_flag("AUTH_DB_CREATE", True):
+            Base.metadata.create_all(self._engine)
+        if _env_flag("AUTH_DB_MIGRATE", True):
+            self.migrate()
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+
+    def migrate(self) -> None:
+        """Adds the indexes declared on the models that are missing from
+        an existing database, without touching its rows.
+        """
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self._engine, checkfirst=True)
 
     @property
     def _session(self) -> Session:
-        """Memoized session object
+        """Session object of the current thread
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Adds a new user to the database.
@@ -47,6 +128,71 @@ class DB:
         self._session.commit()
         return new_user
 
+    def existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """Returns which of the given emails are already registered, in one
+        query.
+
+        Args:
+            emails (Iterable[str]): The email addresses to check.
+
+        Returns:
+            Set[str]: The registered ones.
+        """
+        emails = list(emails)
+        if not emails:
+            return set()
+        result = self._session.execute(
+            select(User.email).where(User.email.in_(emails)))
+        return set(result.scalars())
+
+    def add_users_bulk(self, users: Iterable[Tuple[str, str]],
+                       batch_size: int = 1000,
+                       check_existing: bool = True) -> int:
+        """Adds users in batched transactions, skipping the emails that are
+        already registered or repeated in `users`.
+
+        Args:
+            users (Iterable[Tuple[str, str]]): (email, hashed_password)
+                pairs.
+            batch_size (int): Users inserted per transaction.
+            check_existing (bool): Whether to look up the registered
+                emails of each batch first; False when the caller has
+                already left them out, the lookup then only happening if
+                an email got registered in between.
+
+        Returns:
+            int: The number of users added.
+        """
+        added = 0
+        batch = {}
+        for email, hashed_password in users:
+            batch.setdefault(email, hashed_password)
+            if len(batch) >= batch_size:
+                added += self._insert_new(batch, check_existing)
+                batch = {}
+        if batch:
+            added += self._insert_new(batch, check_existing)
+        return added
+
+    def _insert_new(self, users: dict, check_existing: bool = True) -> int:
+        """Inserts the users of an {email: hashed_password} batch that are
+        not registered yet, in one transaction.
+        """
+        existing = self.existing_emails(users) if check_existing else ()
+        rows = [{"email": email, "hashed_password": hashed_password}
+                for email, hashed_password in users.items()
+                if email not in existing]
+        try:
+            if rows:
+                self._session.execute(insert(User), rows)
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            if check_existing:
+                raise
+            return self._insert_new(users)
+        return len(rows)
+
     def find_user_by(self, **kwargs) -> User:
         """Finds a user in the database based on given criteria.
 
@@ -69,7 +215,8 @@ class DB:
             raise InvalidRequestError
 
     def update_user(self, user_id: int, **kwargs) -> None:
-        """Updates a user's attributes in the database.
+        """Updates a user's attributes in the database with a single
+        UPDATE statement.
 
         Args:
             user_id (int): The ID of the user to update.
@@ -79,20 +226,54 @@ class DB:
             ValueError: If an invalid attribute is passed for update.
             NoResultFound: If no user is found with the given ID.
         """
-        user = self.find_user_by(id=user_id)
-        if not user:
+        self._check_columns(kwargs)
+        result = self._session.execute(
+            update(User).where(User.id == user_id).values(**kwargs))
+        self._session.commit()
+        if result.rowcount == 0:
             raise NoResultFound
 
-        for key, value in kwargs.items():
-            if hasattr(user, key):
-                setattr(user, key, value)
-            else:
-                raise ValueError(f"Invalid attribute for User model: {key}")
+    def update_user_by_email(self, email: str, **kwargs) -> int:
+        """Updates the attributes of the user with the given email, with a
+        single UPDATE ... RETURNING statement when the database allows it.
+
+        Args:
+            email (str): The email of the user to update.
+            **kwargs: Keyword arguments representing the attributes to update.
+
+        Returns:
+            int: The ID of the updated user.
 
+        Raises:
+            ValueError: If an invalid attribute is passed for update.
+            NoResultFound: If no user is found with the given email.
+        """
+        self._check_columns(kwargs)
+        if not getattr(self._engine.dialect, "update_returning", False):
+            user_id = self.find_user_by(email=email).id
+            self.update_user(user_id, **kwargs)
+            return user_id
+        user_id = self._session.execute(
+            update(User).where(User.email == email).values(**kwargs)
+            .returning(User.id)).scalar()
         self._session.commit()
+        if user_id is None:
+            raise NoResultFound
+        return user_id
+
+    def _check_columns(self, kwargs: dict) -> None:
+        """Checks that every key names a column of the users table.
+
+        Raises:
+            ValueError: If a key is not a column of the User model.
+        """
+        for key in kwargs:
+            if key not in USER_COLUMNS:
+                raise ValueError(f"Invalid attribute for User model: {key}")
 
     def close_session(self):
         """
-        closes the session
+        closes the session of the current thread and returns its
+        connection to the pool
         """
-        self.__session.close()
+        self.__session.remove()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Hasher module
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import bcrypt
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when the hashing pool has no room for another job.
+    """
+
+
+def _hashpw(password: str) -> bytes:
+    """Hashes a password using bcrypt, in a worker process.
+    """
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+
+
+def _checkpw(password: str, hashed_password: bytes) -> bool:
+    """Checks a password against a bcrypt hash, in a worker process.
+    """
+    return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+class HashingPool:
+    """Runs bcrypt work in a pool of processes, off the request thread.
+
+    At most `workers + max_queue` jobs are in flight; past that, jobs
+    are refused with HashingPoolSaturated instead of queueing forever.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None) -> None:
+        """Initialize a new HashingPool instance
+
+        Args:
+            workers (int): Number of processes, defaults to the CPU count.
+            max_queue (int): Jobs allowed to wait for a free process,
+                defaults to twice the number of processes.
+        """
+        workers = workers or os.cpu_count() or 1
+        if max_queue is None:
+            max_queue = 2 * workers
+        self._workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+
+    def _run(self, fn, *args):
+        """Runs a job in the pool and waits for its result.
+
+        Raises:
+            HashingPoolSaturated: If too many jobs are already in flight.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated("Hashing pool is saturated")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hashpw(self, password: str) -> bytes:
+        """Hashes a password using bcrypt.
+
+        Args:
+            password (str): The password to hash.
+
+        Returns:
+            bytes: The hashed password.
+        """
+        return self._run(_hashpw, password)
+
+    def checkpw(self, password: str, hashed_password: bytes) -> bool:
+        """Checks a password against a bcrypt hash.
+
+        Args:
+            password (str): The password to check.
+            hashed_password (bytes): The bcrypt hash.
+
+        Returns:
+            bool: True if the password matches, False otherwise.
+        """
+        return self._run(_checkpw, password, hashed_password)
+
+    def hashpw_many(self, passwords: List[str]) -> List[bytes]:
+        """Hashes a batch of passwords across all the processes.
+
+        Batch jobs are not subject to the in-flight limit.
+
+        Args:
+            passwords (List[str]): The passwords to hash.
+
+        Returns:
+            List[bytes]: The hashed passwords, in the same order.
+        """
+        chunksize = max(1, len(passwords) // (4 * self._workers))
+        return list(self._executor.map(_hashpw, passwords,
+                                       chunksize=chunksize))
+
+    def shutdown(self) -> None:
+        """Stops the worker processes.
+        """
+        self._executor.shutdown()
+
+
+def hashing_pool_from_env() -> HashingPool:
+    """Builds the hashing pool configured by AUTH_HASH_WORKERS
+    (0 or unset: hash inline) and AUTH_HASH_QUEUE.
+
+    Returns:
+        HashingPool: The pool, or None when hashing runs inline.
+    """
+    workers = int(os.getenv("AUTH_HASH_WORKERS", "0"))
+    if workers <= 0:
+        return None
+    max_queue = os.getenv("AUTH_HASH_QUEUE")
+    if max_queue is not None:
+        max_queue = int(max_queue)
+    return HashingPool(workers, max_queue)
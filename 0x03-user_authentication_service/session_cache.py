@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Session cache module
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class SessionUser(NamedTuple):
+    """The user of a session as cached: only its id and email, not a
+    database row.
+    """
+    id: int
+    email: str
+
+
+class SessionCache:
+    """Bounded LRU cache of session_id -> SessionUser with a TTL.
+
+    The cache lives in one process: a logout or password reset handled
+    by another worker process is only seen once the entry expires. It
+    is only safe with a single worker, or with a TTL short enough to
+    tolerate that delay.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 5) -> None:
+        """Initialize a new SessionCache instance
+
+        Args:
+            max_size (int): Maximum number of cached sessions.
+            ttl (float): Seconds an entry stays valid.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._session_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionUser:
+        """Looks up a session.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            SessionUser: The user id and email, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[2] < time.monotonic():
+                self._drop(session_id)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(session_id)
+            return SessionUser(entry[0], entry[1])
+
+    def put(self, session_id: str, user_id: int, email: str) -> None:
+        """Caches a session, replacing any other session of the user.
+
+        Args:
+            session_id (str): The session ID.
+            user_id (int): The ID of the session's user.
+            email (str): The email of the session's user.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            previous = self._session_by_user.get(user_id)
+            if previous is not None:
+                self._drop(previous)
+            self._entries[session_id] = (user_id, email,
+                                         time.monotonic() + self.ttl)
+            self._entries.move_to_end(session_id)
+            self._session_by_user[user_id] = session_id
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Forgets the cached session of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        with self._lock:
+            session_id = self._session_by_user.get(user_id)
+            if session_id is not None:
+                self._drop(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        """Removes an entry, the lock being held.
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is not None and \
+                self._session_by_user.get(entry[0]) == session_id:
+            del self._session_by_user[entry[0]]
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and the cache size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries)}
+
+
+def session_cache_from_env() -> SessionCache:
+    """Builds the session cache configured by AUTH_SESSION_CACHE_SIZE
+    (0 or unset: no cache) and AUTH_SESSION_CACHE_TTL (default 5 s).
+
+    Returns:
+        SessionCache: The cache, or None when caching is disabled.
+    """
+    max_size = int(os.getenv("AUTH_SESSION_CACHE_SIZE", "0"))
+    if max_size <= 0:
+        return None
+    ttl = float(os.getenv("AUTH_SESSION_CACHE_TTL", "5"))
+    return SessionCache(max_size, ttl)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Concurrency stress test of the per-thread database sessions.
+
+Threads register, log in and read /profile at the same time, each with
+its own users; every thread must only ever see its own users.
+Run with: python3 -m pytest test_concurrency.py
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["AUTH_DB_URL"] = "sqlite:///{}".format(
+    os.path.join(DB_DIR, "stress.db"))
+os.environ["AUTH_DB_RESET"] = "1"
+
+from app import app  # noqa: E402
+
+THREADS = 8
+USERS_PER_THREAD = 2
+PROFILE_READS = 20
+
+
+class TestConcurrentRequests(unittest.TestCase):
+    """Concurrent requests must not share database session state."""
+
+    def run_client(self, thread: int, barrier: threading.Barrier,
+                   errors: list) -> None:
+        """Registers, logs in and reads the profile of the users of one
+        thread, recording any request that sees another user.
+        """
+        client = app.test_client()
+        barrier.wait()
+        for n in range(USERS_PER_THREAD):
+            email = "t{}u{}@stress.test".format(thread, n)
+            form = {"email": email, "password": "pw{}".format(thread)}
+            response = client.post("/users", data=form)
+            if response.status_code != 200:
+                errors.append((email, "register", response.status_code))
+                continue
+            response = client.post("/sessions", data=form)
+            if response.status_code != 200:
+                errors.append((email, "login", response.status_code))
+                continue
+            for _ in range(PROFILE_READS):
+                response = client.get("/profile")
+                if response.status_code != 200 or \
+                        response.get_json() != {"email": email}:
+                    errors.append((email, "profile",
+                                   response.status_code,
+                                   response.get_json()))
+
+    def test_no_cross_request_leakage(self):
+        """Each thread only sees its own users."""
+        barrier = threading.Barrier(THREADS)
+        errors = []
+        threads = [threading.Thread(target=self.run_client,
+                                    args=(i, barrier, errors))
+                   for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()